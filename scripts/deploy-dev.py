@@ -1,15 +1,16 @@
 import os
 import time
+import random
 import argparse
-import glob
+import concurrent.futures
 from utils import *
 
 parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 parser.add_argument("--spn-auth", action="store_true", default=True)
 parser.add_argument("--workspace", default="SalesSense")
-parser.add_argument("--admin-upns", default=os.getenv("FABRIC_ADMIN_UPNS"))
+parser.add_argument("--admin-upns", default=get_fab_env("FABRIC_ADMIN_UPNS"))
 parser.add_argument(
-    "--capacity", default=os.getenv("FABRIC_CAPACITY")
+    "--capacity", default=get_fab_env("FABRIC_CAPACITY")
 )
 
 args = parser.parse_args()
@@ -20,7 +21,7 @@ workspace_name = args.workspace
 admin_upns = args.admin_upns
 
 if admin_upns:
-    admin_upns = [upn.strip() for upn in admin_upns.split(",")]
+    admin_upns = list(parse_upns(admin_upns))
 
 lakehouse_name = "LH_STORE_RAW"
 connection_name = "SalesSense - DEV"
@@ -31,136 +32,177 @@ connection_source_url = "https://raw.githubusercontent.com/pbi-tools/sales-sampl
 if spn_auth:
     fab_authenticate_spn()
 
-# Create Fabric connection to use in data pipeline
+# Independent deploy steps run in parallel to overlap the fab round-trips
 
-connection_id = create_connection(    
-    connection_name=connection_name,
-    parameters={
-        "connectionDetails.type": "HttpServer",
-        "connectionDetails.parameters.url": connection_source_url,
-        "credentialDetails.type": "Anonymous",
-    }    
-)
+with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
 
-# Create workspace
+    # Create Fabric connection to use in data pipeline
 
-workspace_id = create_workspace(workspace_name, capacity_name, upns=admin_upns)
+    connection_future = executor.submit(
+        create_connection,
+        connection_name=connection_name,
+        parameters={
+            "connectionDetails.type": "HttpServer",
+            "connectionDetails.parameters.url": connection_source_url,
+            "credentialDetails.type": "Anonymous",
+        },
+    )
 
-# Create lakehouse
+    # Create workspace
 
-lakehouse_id = create_item(
-    workspace_name=workspace_name,
-    item_type="lakehouse",
-    item_name=lakehouse_name,
-    parameters={"enableSchemas": "true"},
-)
+    workspace_future = executor.submit(
+        create_workspace, workspace_name, capacity_name, upns=admin_upns
+    )
 
-# Deploy data pipeline binded to the connection and workspace
-
-deploy_item(
-    "src/DP_INGST_CopyCSV.DataPipeline",
-    workspace_name=workspace_name,
-    find_and_replace={
-        (
-            r"pipeline-content.json",
-            r'("workspaceId"\s*:\s*)".*"',
-        ): rf'\1"{workspace_id}"',
-        (
-            r"pipeline-content.json",
-            r'("artifactId"\s*:\s*)".*"',
-        ): rf'\1"{lakehouse_id}"',
-        (
-            r"pipeline-content.json",
-            r'("connection"\s*:\s*)".*"',
-        ): rf'\1"{connection_id}"',
-    },    
-)
+    workspace_id = workspace_future.result()
 
-# Deploy notebook
-
-deploy_item(
-    "src/NB_TRNSF_Raw.Notebook",
-    workspace_name=workspace_name,
-    find_and_replace={
-        (
-            r"notebook-content.ipynb",
-            r'("default_lakehouse"\s*:\s*)".*"',
-        ): rf'\1"{lakehouse_id}"',
-        (
-            r"notebook-content.ipynb",
-            r'("default_lakehouse_name"\s*:\s*)".*"',
-        ): rf'\1"{lakehouse_name}"',
-        (
-            r"notebook-content.ipynb",
-            r'("default_lakehouse_workspace_id"\s*:\s*)".*"',
-        ): rf'\1"{workspace_id}"',
-        (
-            r"notebook-content.ipynb",
-            r'("known_lakehouses"\s*:\s*)\[[\s\S]*?\]',
-        ): rf'\1[{{"id": "{lakehouse_id}"}}]',
-    },
-)
+    # Create lakehouse
 
-# Get SQL endpoint - its created asynchronously so we need to wait for it to be available
+    lakehouse_id = create_item(
+        workspace_name=workspace_name,
+        item_type="lakehouse",
+        item_name=lakehouse_name,
+        parameters={"enableSchemas": "true"},
+    )
 
-sql_endpoint = None
+    connection_id = connection_future.result()
 
-for attempt in range(3):
+    # Deploy data pipeline binded to the connection and workspace
 
-    sql_endpoint = run_fab_command(
-        f"get /{workspace_name}.workspace/{lakehouse_name}.lakehouse -q properties.sqlEndpointProperties.connectionString",
-        capture_output=True,
+    pipeline_future = executor.submit(
+        deploy_item,
+        "src/DP_INGST_CopyCSV.DataPipeline",
+        workspace_name=workspace_name,
+        find_and_replace={
+            (
+                r"pipeline-content.json",
+                r'("workspaceId"\s*:\s*)".*"',
+            ): rf'\1"{workspace_id}"',
+            (
+                r"pipeline-content.json",
+                r'("artifactId"\s*:\s*)".*"',
+            ): rf'\1"{lakehouse_id}"',
+            (
+                r"pipeline-content.json",
+                r'("connection"\s*:\s*)".*"',
+            ): rf'\1"{connection_id}"',
+        },
     )
 
-    if sql_endpoint != None and sql_endpoint != "":
-        break
+    # Deploy notebook
 
-    print("Waiting for SQL endpoint...")
+    notebook_future = executor.submit(
+        deploy_item,
+        "src/NB_TRNSF_Raw.Notebook",
+        workspace_name=workspace_name,
+        find_and_replace={
+            (
+                r"notebook-content.ipynb",
+                r'("default_lakehouse"\s*:\s*)".*"',
+            ): rf'\1"{lakehouse_id}"',
+            (
+                r"notebook-content.ipynb",
+                r'("default_lakehouse_name"\s*:\s*)".*"',
+            ): rf'\1"{lakehouse_name}"',
+            (
+                r"notebook-content.ipynb",
+                r'("default_lakehouse_workspace_id"\s*:\s*)".*"',
+            ): rf'\1"{workspace_id}"',
+            (
+                r"notebook-content.ipynb",
+                r'("known_lakehouses"\s*:\s*)\[[\s\S]*?\]',
+            ): rf'\1[{{"id": "{lakehouse_id}"}}]',
+        },
+    )
 
-    time.sleep(30)
+    # Get SQL endpoint - its created asynchronously so we need to wait for it to be available
+    # Poll with exponential backoff and jitter, for up to 5 minutes
 
-if sql_endpoint == None or sql_endpoint == "" or sql_endpoint == "None":
-    raise Exception(f"Cannot resolve SQL endpoint for lakehouse {lakehouse_name}")
+    sql_endpoint = None
 
-# Deploy semantic model
+    deadline = time.monotonic() + 300
 
-semanticmodel_id = deploy_item(
-    "src/SM_SalesSense.SemanticModel",
-    workspace_name=workspace_name,
-    find_and_replace={
-        (
-            r"expressions.tmdl",
-            r'(expression\s+Server\s*=\s*)".*?"',
-        ): rf'\1"{sql_endpoint}"'
-    },
-)
+    delay = 2
 
-# Deploy reports
+    while True:
 
-for report_path in glob.glob("src/*.Report"):
+        sql_endpoint = run_fab_command(
+            f"get /{workspace_name}.workspace/{lakehouse_name}.lakehouse -q properties.sqlEndpointProperties.connectionString",
+            capture_output=True,
+        )
 
-    deploy_item(
-        report_path,
+        if sql_endpoint and sql_endpoint != "None":
+            break
+
+        if time.monotonic() + delay > deadline:
+            raise Exception(f"Cannot resolve SQL endpoint for lakehouse {lakehouse_name}")
+
+        log("Waiting for SQL endpoint...")
+
+        time.sleep(delay + random.uniform(0, delay * 0.1))
+
+        delay = min(delay * 2, 30)
+
+    # Deploy semantic model
+
+    semanticmodel_id = deploy_item(
+        "src/SM_SalesSense.SemanticModel",
         workspace_name=workspace_name,
         find_and_replace={
-            ("definition.pbir", r"\{[\s\S]*\}"): json.dumps(
-                {
-                    "version": "4.0",
-                    "datasetReference": {
-                        "byConnection": {
-                            "connectionString": None,
-                            "pbiServiceModelId": None,
-                            "pbiModelVirtualServerName": "sobe_wowvirtualserver",
-                            "pbiModelDatabaseName": semanticmodel_id,
-                            "name": "EntityDataSource",
-                            "connectionType": "pbiServiceXmlaStyleLive",
-                        }
-                    },
+            (
+                r"expressions.tmdl",
+                r'(expression\s+Server\s*=\s*)".*?"',
+            ): rf'\1"{sql_endpoint}"'
+        },
+    )
+
+    # Deploy reports, all of them are binded to the same semantic model
+
+    report_definition = json.dumps(
+        {
+            "version": "4.0",
+            "datasetReference": {
+                "byConnection": {
+                    "connectionString": None,
+                    "pbiServiceModelId": None,
+                    "pbiModelVirtualServerName": "sobe_wowvirtualserver",
+                    "pbiModelDatabaseName": semanticmodel_id,
+                    "name": "EntityDataSource",
+                    "connectionType": "pbiServiceXmlaStyleLive",
                 }
-            )
+            },
         },
+        separators=(",", ":"),
     )
 
+    # Replace the whole top level JSON object, anchored to the start and end of the file
+
+    report_find_and_replace = {
+        (r"definition\.pbir$", r"(?s)\A\{.*\}(?=\s*\Z)"): report_definition
+    }
+
+    def deploy_report(report_path):
+
+        return deploy_item(
+            report_path,
+            workspace_name=workspace_name,
+            find_and_replace=report_find_and_replace,
+        )
+
+    with os.scandir("src") as entries:
+        report_paths = [
+            entry.path
+            for entry in entries
+            if entry.is_dir(follow_symlinks=False) and entry.name.endswith(".Report")
+        ]
+
+    list(executor.map(deploy_report, report_paths))
+
+    # Wait for the data pipeline and notebook deployments, raising their errors if any
+
+    pipeline_future.result()
+    notebook_future.result()
+
 run_fab_command(f"open {workspace_name}.workspace")
 
 # Log out in case of auth with SPN
@@ -2,15 +2,532 @@ import os
 import shutil
 import subprocess
 import re
+import select
 import json
+import atexit
+import contextlib
+import fnmatch
+import functools
+import hashlib
+import mmap
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msal
+    import requests
+except ImportError:
+    msal = None
+    requests = None
+
+# Set FAB_SESSION=true to pipe all commands into a single interactive `fab` process
+# instead of spawning `fab -c` for every command
+
+FAB_SESSION = os.getenv("FAB_SESSION", "").lower() in ("1", "true")
+
+# Fabric environment variables, read once at import time. Call refresh_env() to read them again
+
+FAB_ENV_VARS = (
+    "FABRIC_CLIENT_ID",
+    "FABRIC_CLIENT_SECRET",
+    "FABRIC_TENANT_ID",
+    "FABRIC_ADMIN_UPNS",
+    "FABRIC_CAPACITY",
+)
+
+_FAB_ENV = {}
+
+# Ids of the Fabric items resolved during the deployment, keyed by the lowercase item path
+
+_ID_CACHE = {}
+
+# Matches a standalone lowercase `id` key only, not `workspaceId`, `capacityId` or `Request Id`
+
+_ID_RE = re.compile(r'(?<![\w-])"?id"?\s*[:=]\s*"?([0-9a-fA-F-]{36})"?')
+
+_WORKSPACE_PATH_RE = re.compile(
+    r"^/(?P<workspace>.+)\.workspace(?:/(?P<name>.+)\.(?P<type>[^./]+))?$", re.IGNORECASE
+)
+
+_CONNECTION_PATH_RE = re.compile(r"^\.connections/(?P<name>.+)\.connection$", re.IGNORECASE)
+
+# REST API client used to resolve ids, set by fab_authenticate_spn when `requests` and `msal` are installed
+
+_fabric_client = None
+
+# Files larger than this are scanned through a memory map before being read by the find & replace
+
+_MMAP_THRESHOLD = 64 * 1024
+
+# Files excluded when copying an item to its staging folder
+
+_STAGING_IGNORE_PATTERNS = ("*.abf",)
+
+
+class _FabSession:
+    """
+    Long-lived interactive `fab` process.
+    Commands are written to the process stdin followed by an `echo` of a unique sentinel, and the
+    output is read until the sentinel shows up. This avoids a CLI cold start and auth context reload per command.
+    """
+
+    # Seconds a command may run before the session is killed, long enough for large imports
+
+    TIMEOUT = 1800
+
+    def __init__(self):
+        self._process = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+
+        self._process = subprocess.Popen(
+            ["fab"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+        )
+
+    def _read_until(self, sentinel, deadline):
+        """
+        Reads stdout and stderr of the session with `select` until a stdout line ends with the sentinel.
+        Returns the stdout lines before the sentinel and the stderr written meanwhile.
+        Raises:
+        Exception: If the deadline passes or the `fab` process exits before the sentinel is read.
+        """
+
+        stdout_fd = self._process.stdout.fileno()
+        stderr_fd = self._process.stderr.fileno()
+
+        fds = [stdout_fd, stderr_fd]
+
+        pending = b""
+
+        lines = []
+
+        stderr = b""
+
+        while True:
+
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                self._kill()
+                raise Exception(
+                    f"Error running fab command. fab session timed out after {self.TIMEOUT}s; stderr: '{stderr.decode(errors='replace')}'"
+                )
+
+            readable, _, _ = select.select(fds, [], [], remaining)
+
+            if stderr_fd in readable:
+                chunk = os.read(stderr_fd, 65536)
+
+                if chunk:
+                    stderr += chunk
+                else:
+                    fds.remove(stderr_fd)
+
+            if stdout_fd in readable:
+                chunk = os.read(stdout_fd, 65536)
+
+                if not chunk:
+                    code = self._process.wait()
+                    self._process = None
+                    raise Exception(
+                        f"Error running fab command. fab session exited with code '{code}'; stderr: '{stderr.decode(errors='replace')}'"
+                    )
+
+                pending += chunk
+
+                *complete, pending = pending.split(b"\n")
+
+                for line in complete:
+
+                    line = line.decode(errors="replace").rstrip("\r")
+
+                    # A REPL that echoes its input also prints the `echo` command itself, which is skipped
+
+                    if line.rstrip().endswith(f"echo {sentinel}"):
+                        continue
+
+                    # The sentinel may follow a REPL prompt, e.g. `fab:/$ <<<FAB_EOF:...>>>`
+
+                    if line.rstrip().endswith(sentinel):
+
+                        # Pick up the stderr the command wrote before the sentinel was echoed
+
+                        readable, _, _ = select.select(fds[1:], [], [], 0)
+
+                        if readable:
+                            stderr += os.read(stderr_fd, 65536)
+
+                        return lines, stderr.decode(errors="replace")
+
+                    lines.append(line)
+
+    def exec(self, command, **kwargs):
+        """
+        Executes a command in the interactive session. See `exec_batch` for the parameters.
+        """
+
+        return self.exec_batch([command], **kwargs)
+
+    def exec_batch(
+        self,
+        commands: list,
+        capture_output: bool = False,
+        silently_continue: bool = False,
+        raise_on_stderr: bool = None,
+        full_output: bool = False,
+    ):
+        """
+        Executes commands in the interactive session with a single write and a single sentinel read.
+        Parameters:
+        commands (list): The Fabric commands to execute, in order.
+        capture_output (bool): If True, returns the last line of output instead of printing it. Defaults to False.
+        silently_continue (bool): If True, errors are printed instead of raised. Defaults to False.
+        raise_on_stderr (bool): If True, output on stderr fails the command. Defaults to capture_output.
+        full_output (bool): If True, all the non-empty lines of output are captured instead of the last one. Defaults to False.
+        Returns:
+        str: The last line of output, or all of them with full_output, if capture_output is True.
+        Raises:
+        Exception: If the command fails, or the `fab` process exits or stalls before the sentinel is read.
+        """
+
+        # The session is shared between deploy threads, one batch runs at a time
+
+        with self._lock:
+
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+
+            sentinel = f"<<<FAB_EOF:{uuid.uuid4().hex}>>>"
+
+            script = "".join(f"{command}\n" for command in commands) + f"echo {sentinel}\n"
+
+            self._process.stdin.write(script.encode())
+            self._process.stdin.flush()
+
+            lines, stderr = self._read_until(sentinel, time.monotonic() + self.TIMEOUT)
+
+        output = []
+
+        # A REPL that echoes its input prints each command back once, in order, possibly after a prompt.
+        # The echoed copies are neither logged nor returned, they may contain secrets
+
+        echoes = [command.strip() for command in commands]
+
+        for line in lines:
+
+            if echoes and (line.strip() == echoes[0] or line.rstrip().endswith(f" {echoes[0]}")):
+                echoes.pop(0)
+                continue
+
+            if not capture_output:
+                log(line)
+            elif line.strip():
+                output.append(line.strip())
+
+        # The session has no exit code, so a failure is only detected through stderr
+
+        _check_fab_result(0, stderr, capture_output, silently_continue, raise_on_stderr)
+
+        if capture_output:
+            return "\n".join(output) if full_output else (output[-1] if output else "")
+
+    def _kill(self):
+
+        self._process.kill()
+        self._process.wait()
+        self._process = None
+
+    def close(self):
+
+        if self._process is not None and self._process.poll() is None:
+            try:
+                self._process.stdin.write(b"exit\n")
+                self._process.stdin.close()
+                self._process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+
+        self._process = None
+
+
+_fab_session = None
+
+_print_lock = threading.Lock()
+
+# Log lines of the GitHub Actions group open in the current thread, None while the group is streamed
+
+_log_buffer = threading.local()
+
+# Thread whose log group is streamed as it runs. Output of the other threads is held in _log_pending
+# until that group ends, so GitHub Actions groups never nest
+
+_log_streaming_thread = None
+
+_log_pending = []
+
+
+def log(*args):
+    """
+    Thread-safe print. Inside a buffered log group the line is collected and printed with the rest of the group.
+    """
+
+    line = " ".join(str(arg) for arg in args)
+
+    lines = getattr(_log_buffer, "lines", None)
+
+    if lines is not None:
+        lines.append(line)
+        return
+
+    with _print_lock:
+
+        if _log_streaming_thread not in (None, threading.get_ident()):
+            _log_pending.append(line)
+        else:
+            print(line, flush=True)
+
+
+@contextlib.contextmanager
+def _log_group(title):
+    """
+    Prints the log lines of the current thread as a GitHub Actions `::group::`.
+    The first group opened while no other group is streaming is printed as it runs. Groups opened meanwhile
+    by other threads are collected and printed as a single block once they finish and the streaming group
+    has ended, so the groups of items deployed in parallel don't interleave.
+    """
+
+    global _log_streaming_thread
+
+    with _print_lock:
+
+        streaming = _log_streaming_thread is None
+
+        if streaming:
+            _log_streaming_thread = threading.get_ident()
+
+            print(f"::group::{title}", flush=True)
+
+            lines = None
+        else:
+            lines = [f"::group::{title}"]
+
+        _log_buffer.lines = lines
+
+    try:
+        yield
+    finally:
+        _log_buffer.lines = None
+
+        with _print_lock:
+
+            if streaming:
+                _log_streaming_thread = None
+
+                lines = ["::endgroup::"] + _log_pending
+
+                _log_pending.clear()
+            else:
+                lines.append("::endgroup::")
+
+                # Wait for the streaming group to end
+
+                if _log_streaming_thread is not None:
+                    _log_pending.extend(lines)
+                    lines = []
+
+            if lines:
+                print("\n".join(lines), flush=True)
+
+
+def _session():
+    """
+    Returns the shared interactive `fab` session, creating it on first use.
+    """
+
+    global _fab_session
+
+    if _fab_session is None:
+        _fab_session = _FabSession()
+        atexit.register(_fab_session.close)
+
+    return _fab_session
+
+
+class FabricClient:
+    """
+    Minimal Fabric REST API client authenticated with a Service Principal.
+    A single `requests.Session` is reused so TCP and TLS connections are pooled across calls,
+    and the access token is cached until it is about to expire.
+    Requires the optional `requests` and `msal` packages.
+    """
+
+    API_URL = "https://api.fabric.microsoft.com/v1"
+
+    SCOPES = ["https://api.fabric.microsoft.com/.default"]
+
+    # (connect, read) timeouts in seconds, a stalled call raises so the caller can fall back to the `fab` CLI
+
+    TIMEOUT = (5, 30)
+
+    def __init__(self, client_id: str, client_secret: str, tenant_id: str):
+
+        self._app = msal.ConfidentialClientApplication(
+            client_id,
+            client_credential=client_secret,
+            authority=f"https://login.microsoftonline.com/{tenant_id}",
+        )
+        self._session = requests.Session()
+        self._token = None
+        self._token_expires_on = 0
+        self._lock = threading.Lock()
+
+    def _get_token(self):
+
+        with self._lock:
+
+            # Renew the token a minute before it expires
+
+            if self._token is None or time.time() > self._token_expires_on - 60:
+
+                result = self._app.acquire_token_for_client(scopes=self.SCOPES)
+
+                if "access_token" not in result:
+                    raise Exception(
+                        f"Error acquiring Fabric API token. error: '{result.get('error')}'; description: '{result.get('error_description')}'"
+                    )
+
+                self._token = result["access_token"]
+                self._token_expires_on = time.time() + int(result.get("expires_in", 0))
+
+            return self._token
+
+    def _get(self, path, params: dict = None):
+
+        response = self._session.get(
+            f"{self.API_URL}/{path}",
+            headers={"Authorization": f"Bearer {self._get_token()}"},
+            params=params,
+            timeout=self.TIMEOUT,
+        )
+
+        if response.status_code >= 400:
+            raise Exception(
+                f"Error calling Fabric API. status_code: '{response.status_code}'; response: '{response.text}'"
+            )
+
+        return response.json()
+
+    def _list(self, path):
+        """
+        Returns all the values of a paginated collection, following the continuation tokens.
+        """
+
+        values = []
+
+        params = {}
+
+        while True:
+
+            data = self._get(path, params)
+
+            values.extend(data.get("value", []))
+
+            continuation_token = data.get("continuationToken")
+
+            if not continuation_token:
+                return values
+
+            params["continuationToken"] = continuation_token
+
+    def get_workspace_id(self, workspace_name: str):
+        """
+        Returns the ID of the workspace with the specified name, or None if it does not exist.
+        """
+
+        for workspace in self._list("workspaces"):
+            if workspace["displayName"].lower() == workspace_name.lower():
+                return workspace["id"]
+
+    def get_item_id(self, workspace_id: str, item_name: str, item_type: str):
+        """
+        Returns the ID of the item with the specified name and type, or None if it does not exist.
+        """
+
+        for item in self._list(f"workspaces/{workspace_id}/items"):
+            if (
+                item["displayName"].lower() == item_name.lower()
+                and item["type"].lower() == item_type.lower()
+            ):
+                return item["id"]
+
+    def get_connection_id(self, connection_name: str):
+        """
+        Returns the ID of the connection with the specified name, or None if it does not exist.
+        """
+
+        for connection in self._list("connections"):
+            if connection["displayName"].lower() == connection_name.lower():
+                return connection["id"]
+
+
+def refresh_env():
+    """
+    Reads the Fabric environment variables (`FAB_ENV_VARS`) into the module cache.
+    Call it again if the variables change while the process is running, e.g. on a secret rotation.
+    """
+
+    _FAB_ENV.clear()
+    _FAB_ENV.update({name: os.environ.get(name) for name in FAB_ENV_VARS})
+
+
+refresh_env()
+
+
+def get_fab_env(name):
+    """
+    Returns the cached value of a Fabric environment variable, or None if it is not set.
+    """
+
+    return _FAB_ENV.get(name)
+
+
+@functools.lru_cache(maxsize=16)
+def parse_upns(upns: str):
+    """
+    Parses a comma separated list of user principal names.
+    Args:
+        upns (str): The comma separated user principal names, e.g. the `FABRIC_ADMIN_UPNS` variable.
+    Returns:
+        tuple: The trimmed, non-empty user principal names.
+    """
+
+    if not upns:
+        return ()
+
+    return tuple(upn.strip() for upn in upns.split(",") if upn.strip())
+
 
 def fab_authenticate_spn(
     client_id: str = None, client_secret: str = None, tenant_id: str = None
 ):
     """
     Authenticates with a Service Principal Name (SPN) using environment variables.
-    This function retrieves the client ID, client secret, and tenant ID from the environment
-    variables `FABRIC_CLIENT_ID`, `FABRIC_CLIENT_SECRET`, and `FABRIC_TENANT_ID` respectively.
+    Unless all of them are provided as arguments, this function retrieves the client ID, client secret, and tenant ID
+    from the environment variables `FABRIC_CLIENT_ID`, `FABRIC_CLIENT_SECRET`, and `FABRIC_TENANT_ID` respectively,
+    as cached at import time (see `refresh_env`).
     It then uses these credentials to authenticate with the SPN.
     Raises:
         Exception: If any of the required environment variables (`FABRIC_CLIENT_ID`,
@@ -19,12 +536,12 @@ def fab_authenticate_spn(
         Executes the `run_fab_command` function to set the encryption fallback and perform the authentication.
     """
 
-    print("Authenticating with SPN")
+    log("Authenticating with SPN")
 
     if client_id is None or client_secret is None or tenant_id is None:
-        client_id = os.getenv("FABRIC_CLIENT_ID")
-        client_secret = os.getenv("FABRIC_CLIENT_SECRET")
-        tenant_id = os.getenv("FABRIC_TENANT_ID")
+        client_id = get_fab_env("FABRIC_CLIENT_ID")
+        client_secret = get_fab_env("FABRIC_CLIENT_SECRET")
+        tenant_id = get_fab_env("FABRIC_TENANT_ID")
 
     if not tenant_id or not client_id or not client_secret:
         raise Exception(
@@ -38,12 +555,30 @@ def fab_authenticate_spn(
         include_secrets=True,
     )
 
+    # Resolve ids through the REST API, reusing one HTTPS connection, when the optional packages are installed
+
+    global _fabric_client
+
+    if msal is not None and requests is not None:
+        _fabric_client = FabricClient(client_id, client_secret, tenant_id)
+
+
+@functools.lru_cache(maxsize=1)
+def _fab_executable():
+    """
+    Returns the absolute path of the `fab` executable, resolved once from PATH.
+    """
+
+    return shutil.which("fab") or "fab"
+
 
 def run_fab_command(
     command,
     capture_output: bool = False,
     include_secrets: bool = False,
     silently_continue: bool = False,
+    raise_on_stderr: bool = None,
+    full_output: bool = False,
 ):
     """
     Executes a Fabric command.
@@ -51,26 +586,203 @@ def run_fab_command(
     command (str): The Fabric command to execute.
     capture_output (bool): If True, captures the command's output. Defaults to False.
     include_secrets (bool): If True, includes secrets in the debug output. Defaults to False.
+    raise_on_stderr (bool): If True, output on stderr fails the command even with a zero exit code.
+        Defaults to capture_output.
+    full_output (bool): If True, all the non-empty lines of output are captured instead of the last one. Defaults to False.
     Returns:
     str: The output of the command if capture_output is True.
     Raises:
     Exception: If there is an error running the Fabric command.
     """
 
-    result = subprocess.run(
-        ["fab", "-c", command], capture_output=capture_output, text=True
-    )
+    if FAB_SESSION:
+        return _session().exec(
+            command,
+            capture_output=capture_output,
+            silently_continue=silently_continue,
+            raise_on_stderr=raise_on_stderr,
+            full_output=full_output,
+        )
 
-    if not (silently_continue) and (result.returncode > 0 or result.stderr):
-        raise Exception(
-            f"Error running fab command. exit_code: '{result.returncode}'; stderr: '{result.stderr}'"
+    # stderr goes to a temporary file so it can't fill up its pipe while stdout is being streamed
+
+    with tempfile.TemporaryFile("w+") as stderr_file:
+
+        # close_fds=False and an absolute executable path let Python use the posix_spawn fast path
+        # instead of fork + exec and a walk of the whole fd table. Python fds are non-inheritable by default
+
+        process = subprocess.Popen(
+            [_fab_executable(), "-c", command],
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            text=True,
+            close_fds=False,
         )
 
+        # Stream stdout keeping only the last line, or the non-empty lines with full_output, instead of
+        # buffering the whole output. Without capture_output the lines are logged, so they stay within
+        # the current log group
+
+        output = ""
+
+        lines = []
+
+        for line in process.stdout:
+            if not capture_output:
+                log(line.rstrip("\n"))
+            elif full_output:
+                if line.strip():
+                    lines.append(line.strip())
+            else:
+                output = line.strip() or output
+
+        process.stdout.close()
+
+        returncode = process.wait()
+
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+
+    _check_fab_result(returncode, stderr, capture_output, silently_continue, raise_on_stderr)
+
     if capture_output:
+        return "\n".join(lines) if full_output else output
+
+
+def _check_fab_result(
+    returncode: int,
+    stderr: str,
+    capture_output: bool,
+    silently_continue: bool,
+    raise_on_stderr: bool = None,
+):
+    """
+    Raises the error of a Fabric command, the same way for `fab -c` and the interactive session.
+    A non-zero exit code always fails the command, stderr only fails it when raise_on_stderr is set,
+    which defaults to capture_output. Otherwise stderr is logged, e.g. a create that failed for other
+    reasons than an existing item.
+    """
 
-        output = result.stdout.strip().split("\n")[-1]
+    if raise_on_stderr is None:
+        raise_on_stderr = capture_output
 
-        return output
+    if returncode > 0 or (raise_on_stderr and stderr):
+
+        if not (silently_continue):
+            raise Exception(
+                f"Error running fab command. exit_code: '{returncode}'; stderr: '{stderr}'"
+            )
+
+    if stderr:
+        log(stderr.rstrip())
+
+
+def get_cached_id(path, output: str = None):
+    """
+    Returns the id of a Fabric item, avoiding a `fab get` round-trip whenever possible.
+    The id is looked up in the cache first, then parsed from a line of the create/import command output
+    that names the item, and only as a last resort fetched with `fab get`.
+    Args:
+        path (str): The Fabric path of the item, e.g. `/MyWorkspace.Workspace/MyLakehouse.Lakehouse`.
+        output (str, optional): The output of the command that created or imported the item. Defaults to None.
+    Returns:
+        str: The ID of the item.
+    """
+
+    key = path.lower()
+
+    if key in _ID_CACHE:
+        return _ID_CACHE[key]
+
+    # Only trust an id found on an output line that names the item
+
+    item_name = path.rstrip("/").split("/")[-1].rsplit(".", 1)[0]
+
+    match = None
+
+    for line in (output or "").splitlines():
+        if item_name.lower() in line.lower():
+            match = _ID_RE.search(line)
+
+            if match:
+                break
+
+    if match:
+        item_id = match.group(1)
+    else:
+        item_id = _get_id_from_api(path)
+
+        if not item_id:
+            item_id = run_fab_command(f"get {path} -q id", capture_output=True)
+
+    if item_id and item_id != "None":
+        _ID_CACHE[key] = item_id
+
+    return item_id
+
+
+def _get_id_from_api(path):
+    """
+    Resolves the id of a Fabric item path through the REST API client.
+    Returns None when the client is not available, the path is not supported or the call fails,
+    so the caller can fall back to the `fab` CLI.
+    """
+
+    if _fabric_client is None:
+        return None
+
+    try:
+        match = _WORKSPACE_PATH_RE.match(path)
+
+        if match:
+
+            workspace_path = f"/{match.group('workspace')}.Workspace"
+
+            workspace_id = _ID_CACHE.get(workspace_path.lower())
+
+            if workspace_id is None:
+                workspace_id = _fabric_client.get_workspace_id(match.group("workspace"))
+
+                if workspace_id:
+                    _ID_CACHE[workspace_path.lower()] = workspace_id
+
+            if not workspace_id or match.group("name") is None:
+                return workspace_id
+
+            return _fabric_client.get_item_id(
+                workspace_id, match.group("name"), match.group("type")
+            )
+
+        match = _CONNECTION_PATH_RE.match(path)
+
+        if match:
+            return _fabric_client.get_connection_id(match.group("name"))
+
+    except Exception as e:
+        log(f"Cannot resolve id of '{path}' through the Fabric API, falling back to fab: {e}")
+
+    return None
+
+
+def _set_admins(path, upns: list):
+    """
+    Assigns the admin role on a Fabric item to the provided user principal names, one `fab acl set` command per UPN.
+    With FAB_SESSION, the commands are sent to the interactive session as a single batch.
+    Args:
+        path (str): The Fabric path of the item, e.g. `/MyWorkspace.Workspace`.
+        upns (list): The user principal names to be assigned as admins.
+    """
+
+    commands = [f"acl set -f {path} -I {upn} -R admin" for upn in upns]
+
+    # One write to the session and one sentinel read for all the UPNs, instead of a round-trip per UPN
+
+    if FAB_SESSION:
+        _session().exec_batch(commands)
+        return
+
+    for command in commands:
+        run_fab_command(command)
 
 
 def create_workspace(workspace_name, capacity_name: str = "none", upns: list = None):
@@ -85,32 +797,30 @@ def create_workspace(workspace_name, capacity_name: str = "none", upns: list = N
         None
     """
 
-    print(f"::group::Creating workspace: {workspace_name}")
+    with _log_group(f"Creating workspace: {workspace_name}"):
 
-    command = f"create /{workspace_name}.Workspace"
+        command = f"create /{workspace_name}.Workspace"
 
-    if capacity_name:
-        command += f" -P capacityName={capacity_name}"
+        if capacity_name:
+            command += f" -P capacityName={capacity_name}"
 
-    run_fab_command(command, silently_continue=True)
+        output = run_fab_command(
+            command, capture_output=True, silently_continue=True, full_output=True
+        )
 
-    if upns is not None:
+        if output:
+            log(output)
 
-        upns = [x for x in upns if x.strip()]
+        if upns is not None:
 
-        if len(upns) > 0:
-            print(f"Adding UPNs")
+            upns = [x for x in upns if x.strip()]
 
-            for upn in upns:
-                run_fab_command(
-                    f"acl set -f /{workspace_name}.Workspace -I {upn} -R admin"
-                )
+            if len(upns) > 0:
+                log(f"Adding UPNs")
 
-    workspace_id = run_fab_command(
-        f"get /{workspace_name}.Workspace -q id", capture_output=True
-    )
+                _set_admins(f"/{workspace_name}.Workspace", upns)
 
-    print(f"::endgroup::")
+        workspace_id = get_cached_id(f"/{workspace_name}.Workspace", output)
 
     return workspace_id
 
@@ -128,36 +838,34 @@ def create_connection(
         str: The ID of the created connection.
     """
 
-    print(f"::group::Creating connection {connection_name}")
+    with _log_group(f"Creating connection {connection_name}"):
 
-    if parameters:
-        param_str = ",".join(f"{key}={value}" for key, value in parameters.items())
-        param_str = f"-P {param_str}"
-    else:
-        param_str = ""
+        if parameters:
+            param_str = ",".join(f"{key}={value}" for key, value in parameters.items())
+            param_str = f"-P {param_str}"
+        else:
+            param_str = ""
 
-    run_fab_command(
-        f"create .connections/{connection_name}.Connection {param_str}",
-        silently_continue=True,
-    )
+        output = run_fab_command(
+            f"create .connections/{connection_name}.Connection {param_str}",
+            capture_output=True,
+            silently_continue=True,
+            full_output=True,
+        )
 
-    connection_id = run_fab_command(
-        f"get .connections/{connection_name}.Connection -q id", capture_output=True
-    )
+        if output:
+            log(output)
 
-    if upns is not None:
+        connection_id = get_cached_id(f".connections/{connection_name}.Connection", output)
 
-        upns = [x for x in upns if x.strip()]
+        if upns is not None:
 
-        if len(upns) > 0:
-            print(f"Adding UPNs to item {connection_name}")
+            upns = [x for x in upns if x.strip()]
 
-            for upn in upns:
-                run_fab_command(
-                    f"acl set -f .connections/{connection_name}.Connection -I {upn} -R admin"
-                )
+            if len(upns) > 0:
+                log(f"Adding UPNs to item {connection_name}")
 
-    print(f"::endgroup::")
+                _set_admins(f".connections/{connection_name}.Connection", upns)
 
     return connection_id
 
@@ -179,25 +887,25 @@ def create_item(
         str: The ID of the created item.
     """
 
-    print(f"::group::Creating item {workspace_name}/{item_name}.{item_type}")
+    with _log_group(f"Creating item {workspace_name}/{item_name}.{item_type}"):
 
-    if parameters:
-        param_str = ",".join(f"{key}={value}" for key, value in parameters.items())
-        param_str = f"-P {param_str}"
-    else:
-        param_str = ""
+        if parameters:
+            param_str = ",".join(f"{key}={value}" for key, value in parameters.items())
+            param_str = f"-P {param_str}"
+        else:
+            param_str = ""
 
-    run_fab_command(
-        f"create /{workspace_name}.workspace/{item_name}.{item_type} {param_str}",
-        silently_continue=True,
-    )
+        output = run_fab_command(
+            f"create /{workspace_name}.workspace/{item_name}.{item_type} {param_str}",
+            capture_output=True,
+            silently_continue=True,
+            full_output=True,
+        )
 
-    item_id = run_fab_command(
-        f"get /{workspace_name}.workspace/{item_name}.{item_type} -q id",
-        capture_output=True,
-    )
+        if output:
+            log(output)
 
-    print(f"::endgroup::")
+        item_id = get_cached_id(f"/{workspace_name}.workspace/{item_name}.{item_type}", output)
 
     return item_id
 
@@ -228,104 +936,311 @@ def deploy_item(
         str: The ID of the deployed item if `what_if` is False. Otherwise, returns None.
     """
 
-    print(f"::group::Deploying {src_path}")
+    with _log_group(f"Deploying {src_path}"):
+
+        # Resolve item name and type from the source platform file, before copying to staging
+
+        if item_name is None or item_type is None:
+
+            platform_name, platform_type = _read_platform(os.path.abspath(src_path))
+
+            if item_name is None:
+                item_name = platform_name
+
+            if item_type is None:
+                item_type = platform_type
+
+        # Items without anything to change are imported straight from the source folder
+
+        if (
+            not find_and_replace
+            and not func_after_staging
+            and not _has_staging_ignored_files(src_path)
+        ):
+            staging_path = src_path
+        else:
+            staging_path = _stage_item(src_path, find_and_replace, func_after_staging)
+
+        item_id = None
+
+        if not what_if:
+
+            # The output is captured to parse the item id, but like an uncaptured import only a
+            # non-zero exit code fails it, warnings on stderr are logged
+
+            output = run_fab_command(
+                f"import -f /{workspace_name}.workspace/{item_name}.{item_type} -i {staging_path}",
+                capture_output=True,
+                raise_on_stderr=False,
+                full_output=True,
+            )
+
+            if output:
+                log(output)
+
+            # Return id after deployment
+
+            item_id = get_cached_id(f"/{workspace_name}.workspace/{item_name}.{item_type}", output)
+
+    return item_id
+
+
+def _stage_item(src_path, find_and_replace: dict = None, func_after_staging=None):
+    """
+    Copies an item to its staging folder and applies the changes to the staged files.
+    The staging folder is reused, also across runs, when it was already built from the same source files
+    and substitutions. Its signature is persisted next to it in a `.signature` file.
+    Returns:
+        str: The path to the staging folder.
+    """
+
+    staging_path = _get_staging_path(src_path)
+
+    signature_path = f"{staging_path}.signature"
+
+    signature = None
+
+    if not func_after_staging:
+
+        signature = _staging_signature(src_path, find_and_replace)
+
+        if (
+            os.path.isdir(staging_path)
+            and os.path.exists(signature_path)
+            and Path(signature_path).read_text() == signature
+        ):
+            log(f"Reusing staging folder '{staging_path}'")
+
+            return staging_path
+
+    # Invalidate the signature before rebuilding, so a failure halfway never leaves a folder that looks up to date
+
+    if os.path.exists(signature_path):
+        os.unlink(signature_path)
 
-    staging_path = copy_to_staging(src_path)
+    # The function may modify the staged files in place, so they are only hardlinked to the source without it
+
+    staging_path = copy_to_staging(src_path, hardlink=not func_after_staging)
 
     # Call function that provides flexibility to change something in the staging files
 
     if func_after_staging:
         func_after_staging(staging_path)
 
-    if os.path.exists(os.path.join(staging_path, ".platform")):
+    _apply_find_and_replace(staging_path, find_and_replace)
+
+    if signature is not None:
+        Path(signature_path).write_text(signature)
+
+    return staging_path
+
+
+def _has_staging_ignored_files(path):
+    """
+    Returns True if `path` contains files that are excluded when copying to staging, e.g. `*.abf`.
+    """
+
+    for _, _, files in os.walk(path):
+        for file_name in files:
+            if any(fnmatch.fnmatch(file_name, pattern) for pattern in _STAGING_IGNORE_PATTERNS):
+                return True
 
-        with open(os.path.join(staging_path, ".platform"), "r") as file:
-            platform_data = json.load(file)
+    return False
 
-        if item_name is None:
-            item_name = platform_data["metadata"]["displayName"]
 
-        if item_type is None:
-            item_type = platform_data["metadata"]["type"]
+def _apply_find_and_replace(staging_path, find_and_replace: dict = None):
+    """
+    Applies the find & replace regular expressions to the files in the staging folder.
+    Args:
+        staging_path (str): The path of the staging folder.
+        find_and_replace (dict, optional): A dictionary where keys are tuples containing a file filter regex and a find regex,
+                                           and values are the replacement strings.
+    """
 
     # Loop through all files and apply the find & replace with regular expressions
 
     if find_and_replace:
 
+        # Compile the file filter and find regular expressions once instead of for every file
+        # Find & replace operates on bytes to skip decoding and encoding the files
+
+        compiled_find_and_replace = [
+            (re.compile(file_filter), re.compile(find.encode()), replace_value.encode())
+            for (file_filter, find), replace_value in find_and_replace.items()
+        ]
+
         for root, _, files in os.walk(staging_path):
-            for file in files:
+            for file_name in files:
 
-                file_path = os.path.join(root, file)
+                file_path = os.path.join(root, file_name)
 
-                with open(file_path, "r") as file:
-                    text = file.read()
+                # Only read the files that match at least one file filter
 
-                # Loop parameters and execute the find & replace in the ones that match the file path
+                applicable = [
+                    (find_regex, replace_value)
+                    for file_filter_regex, find_regex, replace_value in compiled_find_and_replace
+                    if file_filter_regex.search(file_path)
+                ]
 
-                for key, replace_value in find_and_replace.items():
+                if not applicable:
+                    continue
 
-                    find_and_replace_file_filter = key[0]
+                path = Path(file_path)
 
-                    find_and_replace_file_find = key[1]
+                # Large files without any match are never read into memory
 
-                    if re.search(find_and_replace_file_filter, file_path):
-                        text, count_subs = re.subn(
-                            find_and_replace_file_find, replace_value, text
-                        )
+                if path.stat().st_size > _MMAP_THRESHOLD and not _mmap_search(
+                    path, [find_regex for find_regex, _ in applicable]
+                ):
+                    continue
 
-                        if count_subs > 0:
+                data = path.read_bytes()
 
-                            print(
-                                f"Find & replace in file '{file_path}' with regex '{find_and_replace_file_find}'"
-                            )
+                total_subs = 0
 
-                            with open(file_path, "w") as file:
-                                file.write(text)
+                for find_regex, replace_value in applicable:
 
-    if not what_if:
-        run_fab_command(
-            f"import -f /{workspace_name}.workspace/{item_name}.{item_type} -i {staging_path}"
-        )
+                    # Skip patterns without matches and substitutions that produce the same content,
+                    # common on re-deploys where the ids are already in place
 
-        # Return id after deployment
+                    if not find_regex.search(data):
+                        continue
 
-        item_id = run_fab_command(
-            f"get /{workspace_name}.workspace/{item_name}.{item_type} -q id",
-            capture_output=True,
-        )
+                    new_data, count_subs = find_regex.subn(replace_value, data)
+
+                    if new_data == data:
+                        continue
+
+                    data = new_data
+
+                    log(
+                        f"Find & replace in file '{file_path}' with regex '{find_regex.pattern.decode()}'"
+                    )
+
+                    total_subs += count_subs
+
+                if total_subs > 0:
+
+                    # Staging files are hardlinked to the source, unlink before writing to keep the source intact
 
-        return item_id
+                    path.unlink()
 
-    print(f"::endgroup::")
+                    path.write_bytes(data)
 
 
-def copy_to_staging(path):
+def _mmap_search(path, regexes: list):
+    """
+    Returns True if any of the bytes regular expressions matches the file, scanning it through a read-only memory map.
+    """
+
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return any(regex.search(mm) for regex in regexes)
+
+
+def _staging_signature(src_path, find_and_replace: dict = None):
+    """
+    Returns a hash of the source files (relative path, modification time and size) and of the substitutions
+    a staging folder is built from. Used to detect whether a staging folder is still up to date.
+    """
+
+    files = []
+
+    for root, _, file_names in os.walk(src_path):
+        for file_name in file_names:
+
+            file_path = os.path.join(root, file_name)
+
+            stat = os.stat(file_path)
+
+            files.append((os.path.relpath(file_path, src_path), stat.st_mtime_ns, stat.st_size))
+
+    signature = (
+        os.path.abspath(src_path),
+        sorted(files),
+        sorted((find_and_replace or {}).items()),
+    )
+
+    return hashlib.sha256(repr(signature).encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=64)
+def _read_platform(src_path):
+    """
+    Reads the item display name and type from the `.platform` file of an item folder.
+    Results are cached by path, use `orjson` to parse the file when it is installed.
+    Args:
+        src_path (str): The absolute path of the item folder.
+    Returns:
+        tuple: The item display name and type, or (None, None) if the folder has no `.platform` file.
+    """
+
+    platform_path = os.path.join(src_path, ".platform")
+
+    if not os.path.exists(platform_path):
+        return None, None
+
+    with open(platform_path, "rb") as file:
+        data = file.read()
+
+    platform_data = orjson.loads(data) if orjson else json.loads(data)
+
+    return platform_data["metadata"]["displayName"], platform_data["metadata"]["type"]
+
+
+def copy_to_staging(path, hardlink: bool = True):
     """
     Copies the contents of the specified directory to a staging folder.
-    This function ensures that a staging folder exists, and if it already exists,
-    it removes the existing staging folder and creates a new one. It then copies
-    all files and directories from the specified path to the staging folder.
+    This function removes the existing staging folder, if any, and copies all files and
+    directories from the specified path to a new staging folder. With hardlink, files are hardlinked
+    instead of copied whenever the file system supports it, and must then be replaced instead of
+    modified in place.
     Args:
         path (str): The path of the directory to be copied to the staging folder.
+        hardlink (bool, optional): If True, hardlinks the files instead of copying them. Defaults to True.
     Returns:
         str: The path to the staging folder where the contents have been copied.
     """
 
-    # ensure staging folder exists
-
-    current_folder = os.path.dirname(__file__)
-    
-    path_staging = os.path.join(current_folder, "_stg", os.path.basename(path))
-
-    if os.path.exists(path_staging):
-        shutil.rmtree(path_staging)
+    path_staging = _get_staging_path(path)
 
-    os.makedirs(path_staging)
+    shutil.rmtree(path_staging, ignore_errors=True)
 
     # copy files to staging folder
 
     shutil.copytree(
-        path, path_staging, dirs_exist_ok=True, ignore=shutil.ignore_patterns("*.abf")
+        path,
+        path_staging,
+        dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns(*_STAGING_IGNORE_PATTERNS),
+        copy_function=_link_or_copy if hardlink else shutil.copy2,
     )
 
     return path_staging
+
+
+def _get_staging_path(path):
+    """
+    Returns the path of the staging folder for the specified directory.
+    """
+
+    current_folder = os.path.dirname(__file__)
+
+    return os.path.join(current_folder, "_stg", os.path.basename(path))
+
+
+def _link_or_copy(src, dst):
+    """
+    Hardlinks `src` to `dst`, falling back to a regular copy when hardlinks are not supported (e.g. across devices).
+    """
+
+    # Never write through an existing link left behind by a partially removed staging folder
+
+    if os.path.lexists(dst):
+        os.unlink(dst)
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+    return dst